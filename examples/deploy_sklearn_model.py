@@ -6,32 +6,74 @@ logs it to MLflow, and deploys it to Modal's serverless infrastructure.
 
 Prerequisites:
     pip install mlflow-modal-deploy scikit-learn
+    pip install skl2onnx onnxruntime  # Only for --onnx
     modal setup  # Configure Modal authentication
 
 Usage:
     python deploy_sklearn_model.py
+    python deploy_sklearn_model.py --onnx  # Serve the forest with ONNX Runtime
+    python deploy_sklearn_model.py --cleanup  # Delete the deployment when done
 """
 
+import argparse
+
 import mlflow
+import pandas as pd
+import sklearn
 from mlflow.deployments import get_deploy_client
 from sklearn.datasets import load_iris
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 
+_CLIENT = None
+
+
+def _client():
+    """Return a Modal deployment client shared by all helpers in this script."""
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = get_deploy_client("modal")
+    return _CLIENT
+
+
+def train_and_log_model(onnx: bool = False):
+    """
+    Train a model and log it to MLflow.
 
-def train_and_log_model():
-    """Train a model and log it to MLflow."""
+    With onnx=True the forest is converted with skl2onnx and logged with the
+    ONNX flavor, so the endpoint predicts with ONNX Runtime's compiled tree
+    kernels instead of scikit-learn's per-tree Python dispatch.
+    """
     # Load data
     iris = load_iris()
     X_train, X_test, y_train, y_test = train_test_split(iris.data, iris.target, test_size=0.2, random_state=42)
 
-    # Train model
-    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    # Train model (a small, shallow forest is plenty for iris and keeps the artifact small)
+    model = RandomForestClassifier(n_estimators=25, max_depth=6, random_state=42, n_jobs=-1)
     model.fit(X_train, y_train)
 
     # Log to MLflow
     with mlflow.start_run() as run:
-        mlflow.sklearn.log_model(model, "model")
+        if onnx:
+            from skl2onnx import convert_sklearn
+            from skl2onnx.common.data_types import FloatTensorType
+
+            # Keep the default ZipMap output (one {class: probability} dict per row):
+            # MLflow's ONNX pyfunc flattens every output to 1-D, so a raw (N, 3)
+            # probability tensor would not line up with the (N,) label output
+            onnx_model = convert_sklearn(
+                model,
+                initial_types=[("float_input", FloatTensorType([None, 4]))],
+            )
+            mlflow.onnx.log_model(onnx_model, "model")
+        else:
+            # Pin requirements explicitly: skips MLflow's inference step and keeps
+            # the uv_pip_install layer in the Modal image small
+            mlflow.sklearn.log_model(
+                model,
+                "model",
+                pip_requirements=[f"scikit-learn=={sklearn.__version__}"],
+            )
         accuracy = model.score(X_test, y_test)
         mlflow.log_metric("accuracy", accuracy)
         print(f"Model accuracy: {accuracy:.4f}")
@@ -39,9 +81,15 @@ def train_and_log_model():
         return run.info.run_id
 
 
-def deploy_to_modal(run_id: str):
-    """Deploy the logged model to Modal."""
-    client = get_deploy_client("modal")
+def deploy_to_modal(run_id: str, keep_warm: bool = True, onnx: bool = False):
+    """
+    Deploy the logged model to Modal.
+
+    With keep_warm=True one container is always running, so requests never wait
+    for a cold start (image pull, dependency install, model load). Set it to
+    False to scale to zero when idle.
+    """
+    client = _client()
 
     # Deploy with CPU (no GPU needed for this small model)
     deployment = client.create_deployment(
@@ -51,7 +99,16 @@ def deploy_to_modal(run_id: str):
             "memory": 1024,  # 1GB RAM
             "cpu": 1.0,
             "timeout": 60,
-            "min_containers": 0,  # Scale to zero when idle
+            "min_containers": 1 if keep_warm else 0,  # 0 scales to zero when idle
+            # Per-request overhead (parsing, DataFrame, predict call) dominates for
+            # tiny payloads, so fold concurrent requests into one predict call. The
+            # endpoint container must accept concurrent requests for there to be
+            # anything to batch.
+            "concurrent_inputs": 32,
+            "enable_batching": True,
+            "max_batch_size": 64,
+            "batch_wait_ms": 20,
+            "extra_pip_packages": ["onnxruntime>=1.16"] if onnx else [],
         },
     )
 
@@ -62,7 +119,7 @@ def deploy_to_modal(run_id: str):
 
 def deploy_with_gpu(run_id: str):
     """Deploy with GPU and batching for high-throughput inference."""
-    client = get_deploy_client("modal")
+    client = _client()
 
     deployment = client.create_deployment(
         name="iris-classifier-gpu",
@@ -86,24 +143,31 @@ def deploy_with_gpu(run_id: str):
 
 def make_prediction(deployment_name: str):
     """Make a prediction using the deployed model."""
-    client = get_deploy_client("modal")
+    client = _client()
 
     # Sample iris features (sepal length, sepal width, petal length, petal width)
-    sample_data = {
-        "sepal length (cm)": [5.1, 6.2, 7.3],
-        "sepal width (cm)": [3.5, 2.9, 3.0],
-        "petal length (cm)": [1.4, 4.3, 6.3],
-        "petal width (cm)": [0.2, 1.3, 1.8],
-    }
-
-    response = client.predict(deployment_name=deployment_name, inputs=sample_data)
+    sample_data = pd.DataFrame(
+        {
+            "sepal length (cm)": [5.1, 6.2, 7.3],
+            "sepal width (cm)": [3.5, 2.9, 3.0],
+            "petal length (cm)": [1.4, 4.3, 6.3],
+            "petal width (cm)": [0.2, 1.3, 1.8],
+        }
+    )
+
+    # Row-oriented "dataframe_split" payload: the endpoint rebuilds the
+    # DataFrame with a single constructor call
+    response = client.predict(
+        deployment_name=deployment_name,
+        inputs={"dataframe_split": sample_data.to_dict(orient="split")},
+    )
     print(f"\nPredictions: {response.predictions}")
     return response
 
 
 def list_deployments():
     """List all Modal deployments."""
-    client = get_deploy_client("modal")
+    client = _client()
     deployments = client.list_deployments()
     print("\nCurrent deployments:")
     for d in deployments:
@@ -113,19 +177,24 @@ def list_deployments():
 
 def cleanup(deployment_name: str):
     """Delete a deployment."""
-    client = get_deploy_client("modal")
+    client = _client()
     client.delete_deployment(deployment_name)
     print(f"\nDeleted deployment: {deployment_name}")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deploy an iris classifier to Modal")
+    parser.add_argument("--onnx", action="store_true", help="Convert the model to ONNX before logging")
+    parser.add_argument("--cleanup", action="store_true", help="Delete the deployment before exiting")
+    args = parser.parse_args()
+
     # Train and log model
     print("Training model...")
-    run_id = train_and_log_model()
+    run_id = train_and_log_model(onnx=args.onnx)
 
     # Deploy to Modal
     print("\nDeploying to Modal...")
-    deployment = deploy_to_modal(run_id)
+    deployment = deploy_to_modal(run_id, keep_warm=True, onnx=args.onnx)
 
     # List deployments
     list_deployments()
@@ -133,5 +202,12 @@ if __name__ == "__main__":
     # Make a prediction (uncomment after deployment is ready)
     # make_prediction("iris-classifier")
 
-    # Cleanup (uncomment to delete)
-    # cleanup("iris-classifier")
+    # The deployment keeps one warm container (billed while it runs) until deleted
+    if args.cleanup:
+        cleanup("iris-classifier")
+    else:
+        print(
+            "\nNOTE: iris-classifier keeps a warm container running until you delete it:\n"
+            "  mlflow deployments delete -t modal --name iris-classifier\n"
+            "(pass --cleanup to delete it at the end of the run instead)"
+        )
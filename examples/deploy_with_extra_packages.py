@@ -20,11 +20,22 @@ Usage:
 """
 
 import mlflow
+import sklearn
 from mlflow.deployments import get_deploy_client
 from sklearn.datasets import load_iris
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 
+_CLIENT = None
+
+
+def _client():
+    """Return a Modal deployment client shared by all helpers in this script."""
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = get_deploy_client("modal")
+    return _CLIENT
+
 
 def train_and_log_model():
     """Train a model and log it to MLflow."""
@@ -33,11 +44,17 @@ def train_and_log_model():
         iris.data, iris.target, test_size=0.2, random_state=42
     )
 
-    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    model = RandomForestClassifier(n_estimators=25, max_depth=6, random_state=42, n_jobs=-1)
     model.fit(X_train, y_train)
 
     with mlflow.start_run() as run:
-        mlflow.sklearn.log_model(model, "model")
+        # Pin requirements explicitly: skips MLflow's inference step and keeps
+        # the uv_pip_install layer in the Modal image small
+        mlflow.sklearn.log_model(
+            model,
+            "model",
+            pip_requirements=[f"scikit-learn=={sklearn.__version__}"],
+        )
         accuracy = model.score(X_test, y_test)
         mlflow.log_metric("accuracy", accuracy)
         print(f"Model accuracy: {accuracy:.4f}")
@@ -54,7 +71,7 @@ def deploy_with_extra_packages(run_id: str):
     - You need production-only packages (monitoring, logging)
     - You want to override versions for compatibility
     """
-    client = get_deploy_client("modal")
+    client = _client()
 
     deployment = client.create_deployment(
         name="iris-classifier-extra-deps",
@@ -85,19 +102,27 @@ def deploy_transformers_model_example():
     Transformers models often need additional packages for efficient inference
     that weren't captured during training.
     """
-    client = get_deploy_client("modal")
-
     # Note: This is a hypothetical deployment showing the pattern
     # In real usage, you'd have an actual transformers model URI
     print("""
-    Example configuration for deploying a Transformers model:
+    Example configuration for deploying an int8-quantized Transformers model.
+
+    Quantize when logging; the saved quantization config is picked up again when
+    the endpoint loads the model, halving weight bytes to download and hold in GPU memory:
+
+    model = AutoModelForCausalLM.from_pretrained(
+        model_name,
+        device_map="auto",
+        quantization_config=BitsAndBytesConfig(load_in_8bit=True),
+    )
+    mlflow.transformers.log_model({"model": model, "tokenizer": tokenizer}, "model")
 
     config = {
         "gpu": "A100",
         "memory": 16384,
         "extra_pip_packages": [
             "accelerate>=0.24",     # Required for efficient GPU inference
-            "bitsandbytes>=0.41",   # For quantization
+            "bitsandbytes>=0.41",   # Required to load the int8 weights
             "safetensors>=0.4",     # Fast model loading
             "sentencepiece",        # Tokenization (often missed)
             "protobuf>=3.20",       # Version compatibility fix
@@ -174,7 +199,7 @@ def print_config_examples():
 
 def list_deployments():
     """List all Modal deployments."""
-    client = get_deploy_client("modal")
+    client = _client()
     deployments = client.list_deployments()
     print("\nCurrent deployments:")
     for d in deployments:
@@ -184,7 +209,7 @@ def list_deployments():
 
 def cleanup(deployment_name: str):
     """Delete a deployment."""
-    client = get_deploy_client("modal")
+    client = _client()
     client.delete_deployment(deployment_name)
     print(f"\nDeleted deployment: {deployment_name}")
 
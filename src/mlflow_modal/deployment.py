@@ -13,6 +13,7 @@ import shutil
 import subprocess
 import urllib.parse
 from collections.abc import Iterator
+from functools import lru_cache
 from typing import Any
 
 import requests
@@ -127,6 +128,21 @@ def _get_model_python_version(model_path: str) -> str | None:
     return None
 
 
+def _warn_on_base_image_python_mismatch(base_image: str | None, python_version: str | None) -> None:
+    """Warn when ``base_image`` ships a different Python than ``python_version``.
+
+    ``python_version`` only selects the ``debian_slim`` image, so a base image overrides it.
+    """
+    if not base_image or not python_version:
+        return
+    match = re.search(r"(?:python:|py)(3\.\d+)", base_image)
+    if match and match.group(1) != python_version:
+        _logger.warning(
+            f"base_image '{base_image}' provides Python {match.group(1)}, but python_version is "
+            f"{python_version}; the base image takes precedence and python_version is ignored"
+        )
+
+
 def _clear_volume(modal, volume_name: str) -> None:
     """Clear Modal volume to allow redeployment."""
     try:
@@ -204,6 +220,25 @@ def _sanitize_deployment_name(name: str) -> str:
     return name
 
 
+def _get_stream_url(endpoint_url: str) -> str:
+    """
+    Derive the predict_stream endpoint URL from a predict endpoint URL.
+
+    Handles both URL patterns, rewriting only the component that names the method:
+    1. Path-based: https://host/predict -> https://host/predict_stream
+    2. Subdomain-based: https://x--y-predict.modal.run -> https://x--y-predict-stream.modal.run
+    """
+    parts = urllib.parse.urlsplit(endpoint_url)
+    path = parts.path.rstrip("/")
+    if path.endswith("/predict"):
+        return urllib.parse.urlunsplit(parts._replace(path=f"{path}_stream"))
+
+    label, dot, domain = parts.netloc.partition(".")
+    if label.endswith("-predict"):
+        return urllib.parse.urlunsplit(parts._replace(netloc=f"{label}-stream{dot}{domain}"))
+    return endpoint_url
+
+
 def _escape_string_for_codegen(value: str) -> str:
     """Escape a string for safe inclusion in generated Python code."""
     return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -218,12 +253,43 @@ def _generate_modal_app_code(
     """
     Generate Modal app Python code for serving an MLflow model.
 
+    Generation is a pure function of its arguments, so results are memoized on a
+    JSON snapshot of the config. Configs that are not JSON-serializable are
+    rendered without caching.
+
     Args:
         app_name: Name of the Modal app
         config: Deployment configuration
         model_requirements: List of pip requirements
         wheel_filenames: List of wheel filenames (just names, not paths) to install from volume
     """
+    requirements_key = tuple(model_requirements) if model_requirements else None
+    wheels_key = tuple(wheel_filenames) if wheel_filenames else None
+    try:
+        config_key = json.dumps(config, sort_keys=True)
+    except (TypeError, ValueError):
+        return _render_modal_app_code(app_name, config, requirements_key, wheels_key)
+    return _render_modal_app_code_cached(app_name, config_key, requirements_key, wheels_key)
+
+
+@lru_cache(maxsize=64)
+def _render_modal_app_code_cached(
+    app_name: str,
+    config_json: str,
+    model_requirements: tuple[str, ...] | None,
+    wheel_filenames: tuple[str, ...] | None,
+) -> str:
+    """Render app code from a JSON-encoded config (hashable cache key)."""
+    return _render_modal_app_code(app_name, json.loads(config_json), model_requirements, wheel_filenames)
+
+
+def _render_modal_app_code(
+    app_name: str,
+    config: dict[str, Any],
+    model_requirements: tuple[str, ...] | None,
+    wheel_filenames: tuple[str, ...] | None,
+) -> str:
+    """Render Modal app code; see _generate_modal_app_code for arguments."""
     gpu_config = config.get("gpu")
     memory = config.get("memory", _DEFAULT_MEMORY)
     cpu = config.get("cpu", _DEFAULT_CPU)
@@ -234,6 +300,8 @@ def _generate_modal_app_code(
     max_batch_size = config.get("max_batch_size", 8)
     batch_wait_ms = config.get("batch_wait_ms", 100)
     python_version = config.get("python_version", "3.10")
+    base_image = config.get("base_image")
+    single_thread_estimators = config.get("single_thread_estimators", True)
     concurrent_inputs = config.get("concurrent_inputs", _DEFAULT_CONCURRENT_INPUTS)
     target_inputs = config.get("target_inputs", _DEFAULT_TARGET_INPUTS)
     buffer_containers = config.get("buffer_containers", _DEFAULT_BUFFER_CONTAINERS)
@@ -250,11 +318,9 @@ def _generate_modal_app_code(
     else:
         gpu_str = f'"{gpu_config}"'
 
-    pip_packages = ["mlflow"]
-    if model_requirements:
-        pip_packages.extend(model_requirements)
-    if extra_pip_packages:
-        pip_packages.extend(extra_pip_packages)
+    # Sorted and de-duplicated so the same package set always renders the same
+    # uv_pip_install layer, letting Modal reuse it from its image cache
+    pip_packages = sorted({"mlflow", *(model_requirements or ()), *(extra_pip_packages or ())})
     uv_pip_install_args = [f'"{pkg}"' for pkg in pip_packages]
     # Use multi-line formatting when there are many packages to avoid
     # generating a single line too long for Python to parse
@@ -273,6 +339,12 @@ def _generate_modal_app_code(
     if pip_install_kwargs_str:
         pip_install_kwargs_str = ", " + pip_install_kwargs_str
 
+    # A pinned registry tag keeps the base layer stable across deployments
+    if base_image:
+        base_image_str = f'modal.Image.from_registry("{_escape_string_for_codegen(base_image)}")'
+    else:
+        base_image_str = f'modal.Image.debian_slim(python_version="{python_version}")'
+
     scaling_parts = []
     min_containers = config.get("min_containers", _DEFAULT_MIN_CONTAINERS)
     max_containers = config.get("max_containers")
@@ -332,11 +404,52 @@ model_volume = modal.Volume.from_name("{app_name}-model-volume", create_if_missi
 MODEL_DIR = "/model"
 {secret_str}
 image = (
-    modal.Image.debian_slim(python_version="{python_version}")
+    {base_image_str}
     .uv_pip_install({uv_pip_install_str}{pip_install_kwargs_str})
 )
 
-@app.cls(
+
+def _to_dataframe(input_data):
+    import pandas as pd
+    # MLflow scoring format: {{"dataframe_split": {{"columns": [...], "data": [[...], ...]}}}}
+    if "dataframe_split" in input_data:
+        split = input_data["dataframe_split"]
+        return pd.DataFrame(data=split["data"], columns=split.get("columns"), index=split.get("index"))
+    return pd.DataFrame(input_data)
+
+
+def _predictions_to_json(prediction):
+    import json
+    import pandas as pd
+    # DataFrame outputs (e.g. ONNX models with several output tensors) become one record per row
+    if isinstance(prediction, pd.DataFrame):
+        return json.loads(prediction.to_json(orient="records"))
+    return prediction.tolist() if hasattr(prediction, "tolist") else prediction
+'''
+
+    single_thread_code = ""
+    if single_thread_estimators:
+        single_thread_code = """        # Serve scikit-learn estimators single-threaded: for small requests, per-call
+        # joblib worker dispatch (n_jobs != 1) costs more than the prediction
+        if "sklearn" in self.model.metadata.flavors:
+            try:
+                raw_model = self.model.get_raw_model()
+                if type(raw_model).__module__.startswith("sklearn.") and "n_jobs" in raw_model.get_params(deep=False):
+                    raw_model.set_params(n_jobs=1)
+            except Exception as e:
+                import logging
+                logging.getLogger(__name__).warning(f"Could not set n_jobs=1 on the loaded model: {e}")
+"""
+
+    load_model_code = f"""    @modal.enter()
+    def load_model(self):
+        import mlflow.pyfunc
+        model_volume.reload()
+{wheel_install_code}
+        self.model = mlflow.pyfunc.load_model(MODEL_DIR)
+{single_thread_code}"""
+
+    cls_decorator = f"""@app.cls(
     image=image,
     gpu={gpu_str},
     memory={memory},
@@ -346,40 +459,65 @@ image = (
     {secrets_arg}
     volumes={{MODEL_DIR: model_volume}},
 )
-{concurrent_decorator_line}class MLflowModel:
-    @modal.enter()
-    def load_model(self):
-        import mlflow.pyfunc
-        model_volume.reload()
-{wheel_install_code}
-        self.model = mlflow.pyfunc.load_model(MODEL_DIR)
-
-'''
+"""
 
     if enable_batching:
+        # Modal rejects a class that has a @modal.batched method alongside any other
+        # method, so batching lives in its own class, which owns the GPU, the warm
+        # containers and the loaded model. MLflowModel becomes a thin HTTP front that
+        # submits each request with .remote(), which is what lets Modal merge
+        # concurrent requests into one batch (.local() would bypass the batch queue).
+        front_parts = [f"timeout={timeout},"]
+        if scaledown_window is not None:
+            front_parts.append(f"scaledown_window={scaledown_window},")
+        front_decorator = "@app.cls(\n    image=image,\n    " + "\n    ".join(front_parts) + "\n)\n"
         code += f"""
+
+{cls_decorator}class MLflowBatchModel:
+{load_model_code}
     @modal.batched(max_batch_size={max_batch_size}, wait_ms={batch_wait_ms})
     def predict_batch(self, inputs: list[dict]) -> list[dict]:
         import pandas as pd
+        # One vectorized predict call for the whole batch, then split the rows per request
+        frames = [_to_dataframe(input_data) for input_data in inputs]
+        predictions = _predictions_to_json(self.model.predict(pd.concat(frames, ignore_index=True)))
         results = []
-        for input_data in inputs:
-            df = pd.DataFrame(input_data)
-            prediction = self.model.predict(df)
-            results.append({{"predictions": prediction.tolist()}})
+        offset = 0
+        for df in frames:
+            results.append({{"predictions": predictions[offset : offset + len(df)]}})
+            offset += len(df)
         return results
 
+
+{front_decorator}{concurrent_decorator_line}class MLflowModel:
     @modal.fastapi_endpoint(method="POST")
     def predict(self, input_data: dict) -> dict:
-        return self.predict_batch.local([input_data])[0]
+        return MLflowBatchModel().predict_batch.remote(input_data)
+
+    @modal.fastapi_endpoint(method="POST")
+    def predict_stream(self, input_data: dict):
+        from fastapi.responses import StreamingResponse
+        import json
+
+        def generate():
+            # The model lives in MLflowBatchModel, so the whole result is sent as one event
+            result = MLflowBatchModel().predict_batch.remote(input_data)
+            yield f"data: {{json.dumps(result)}}\\n\\n"
+            yield "data: [DONE]\\n\\n"
+
+        return StreamingResponse(generate(), media_type="text/event-stream")
 """
-    else:
-        code += """
+        return code
+
+    code += f"""
+
+{cls_decorator}{concurrent_decorator_line}class MLflowModel:
+{load_model_code}
     @modal.fastapi_endpoint(method="POST")
     def predict(self, input_data: dict) -> dict:
-        import pandas as pd
-        df = pd.DataFrame(input_data)
+        df = _to_dataframe(input_data)
         prediction = self.model.predict(df)
-        return {"predictions": prediction.tolist()}
+        return {{"predictions": _predictions_to_json(prediction)}}
 """
 
     # Add streaming endpoint for LLM-style models
@@ -402,10 +540,9 @@ image = (
                 pass
 
             # Fall back to regular prediction for non-streaming models
-            import pandas as pd
-            df = pd.DataFrame(input_data)
+            df = _to_dataframe(input_data)
             prediction = self.model.predict(df)
-            yield f"data: {json.dumps({'predictions': prediction.tolist()})}\\n\\n"
+            yield f"data: {json.dumps({'predictions': _predictions_to_json(prediction)})}\\n\\n"
             yield "data: [DONE]\\n\\n"
 
         return StreamingResponse(generate(), media_type="text/event-stream")
@@ -495,6 +632,8 @@ class ModalDeploymentClient(BaseDeploymentClient):
             "max_containers": _DEFAULT_MAX_CONTAINERS,
             "buffer_containers": _DEFAULT_BUFFER_CONTAINERS,
             "python_version": None,
+            "base_image": None,
+            "single_thread_estimators": True,
             "extra_pip_packages": [],
             "pip_index_url": None,
             "pip_extra_index_url": None,
@@ -548,7 +687,7 @@ class ModalDeploymentClient(BaseDeploymentClient):
             "target_inputs",
         }
         float_fields = {"cpu"}
-        bool_fields = {"enable_batching"}
+        bool_fields = {"enable_batching", "single_thread_estimators"}
 
         for key, value in custom_config.items():
             if key not in config:
@@ -599,6 +738,9 @@ class ModalDeploymentClient(BaseDeploymentClient):
                 - min_containers: Minimum containers (default: 0)
                 - max_containers: Maximum containers (default: None)
                 - python_version: Python version (default: auto-detect)
+                - base_image: Registry image to build on instead of debian_slim; overrides
+                  python_version (default: None)
+                - single_thread_estimators: Set n_jobs=1 on scikit-learn models at load (default: True)
             endpoint: Unused, kept for API compatibility
 
         Returns:
@@ -622,6 +764,7 @@ class ModalDeploymentClient(BaseDeploymentClient):
             if deployment_config.get("python_version") is None:
                 detected_version = _get_model_python_version(local_model_path)
                 deployment_config["python_version"] = detected_version or "3.10"
+            _warn_on_base_image_python_mismatch(deployment_config["base_image"], deployment_config["python_version"])
 
             model_requirements, wheel_files = _get_model_requirements(local_model_path)
             if model_requirements:
@@ -898,13 +1041,7 @@ class ModalDeploymentClient(BaseDeploymentClient):
         # Construct streaming endpoint URL
         stream_url = None
         if endpoint_url:
-            # Handle both URL patterns:
-            # 1. Path-based: https://host/predict -> https://host/predict_stream
-            # 2. Subdomain-based: https://x--y-predict.modal.run -> https://x--y-predict-stream.modal.run
-            if "/predict" in endpoint_url:
-                stream_url = endpoint_url.replace("/predict", "/predict_stream")
-            else:
-                stream_url = endpoint_url.replace("-predict.", "-predict-stream.")
+            stream_url = _get_stream_url(endpoint_url)
         else:
             # Construct URL from Modal naming convention
             stream_url = self._construct_endpoint_url(deployment_name, "predict_stream")
@@ -974,6 +1111,7 @@ def run_local(
         if deployment_config.get("python_version") is None:
             detected_version = _get_model_python_version(local_model_path)
             deployment_config["python_version"] = detected_version or "3.10"
+        _warn_on_base_image_python_mismatch(deployment_config["base_image"], deployment_config["python_version"])
 
         model_requirements, wheel_files = _get_model_requirements(local_model_path)
         if model_requirements:
@@ -1025,6 +1163,11 @@ def target_help() -> str:
     - ``memory``: Memory allocation in MB (default: 512)
     - ``cpu``: CPU cores (default: 1.0)
     - ``timeout``: Request timeout in seconds (default: 300)
+    - ``base_image``: Registry image with Python to build on, e.g. "python:3.10-slim-bookworm"
+                      (default: None, uses Modal's debian_slim). Overrides ``python_version``,
+                      so pick an image whose Python matches the model's.
+    - ``single_thread_estimators``: Set ``n_jobs=1`` on scikit-learn models at load time
+                                    (default: True)
 
     Scaling Configuration:
     - ``min_containers``: Minimum containers to keep warm (default: 0)
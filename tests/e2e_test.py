@@ -2,7 +2,10 @@
 """
 End-to-end tests for mlflow-modal-deploy.
 
-These tests deploy real models to Modal and verify:
+Config-only checks run first, in-process, and verify that each config option
+survives config parsing and reaches the generated app code without a Modal build.
+
+These tests then deploy real models to Modal and verify:
 1. Basic deployment with extra_pip_packages
 2. pip_index_url configuration
 3. pip_extra_index_url configuration
@@ -17,175 +20,350 @@ Usage:
     python tests/e2e_test.py              # Run all tests
     python tests/e2e_test.py --quick      # Run quick test only (basic deployment)
     python tests/e2e_test.py --stream     # Run streaming test only
+    python tests/e2e_test.py --config-only  # Run in-process config checks only (no deployments)
+    python tests/e2e_test.py --retrain    # Ignore the cached model run and retrain
+    python tests/e2e_test.py --no-parallel  # Run tests one at a time (unmixed output)
+    python tests/e2e_test.py --hedge-delay 5  # Hedge slow predictions sooner
 """
 
+# mlflow, scikit-learn and the plugin are imported where they are used, so --help
+# does not pay for the ML stack and scikit-learn loads only when a model is trained.
+# modal is still imported at module scope, so --help pays for that import.
 import argparse
-import subprocess
+import hashlib
+import json
 import sys
+import threading
 import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from importlib.metadata import version
+from pathlib import Path
+
+import modal
+import requests
+from requests.adapters import HTTPAdapter
+
+# Trained model runs are cached per (sklearn version, dataset, hyperparameters)
+MODEL_CACHE_DIR = Path.home() / ".cache" / "mlflow-modal-e2e"
+# Run tag holding the same key, so a run can be found in the tracking store without the local file
+MODEL_CACHE_TAG = "e2e_model_cache_key"
+N_ESTIMATORS = 1
+MAX_DEPTH = 3
+RANDOM_STATE = 42
+
+# (connect, read) timeouts: fail fast on DNS/connect errors. Slow cold starts are covered by
+# keep-warm, hedging and retries, so a single read need not wait minutes.
+PREDICT_TIMEOUT = (10, 60)
+# Rows per prediction request
+PREDICT_BATCH_ROWS = 16
+# Shared by every prediction and streaming request. A multi-row batch exercises the
+# endpoint under realistic load for the same per-request overhead.
+SAMPLE_DATA = {
+    "sepal length (cm)": [5.1] * PREDICT_BATCH_ROWS,
+    "sepal width (cm)": [3.5] * PREDICT_BATCH_ROWS,
+    "petal length (cm)": [1.4] * PREDICT_BATCH_ROWS,
+    "petal width (cm)": [0.2] * PREDICT_BATCH_ROWS,
+}
+# Seconds to wait on a prediction before racing a duplicate request against it
+HEDGE_DELAY = 20.0
+
+# config key -> (value, snippet expected in the generated app code)
+CONFIG_CASES = {
+    "extra_pip_packages": (["structlog>=24.0"], '"structlog>=24.0"'),
+    "pip_index_url": ("https://pypi.org/simple/", 'index_url="https://pypi.org/simple/"'),
+    "pip_extra_index_url": ("https://pypi.org/simple/", 'extra_index_url="https://pypi.org/simple/"'),
+    "modal_secret": ("e2e-test-pip-credentials", 'modal.Secret.from_name("e2e-test-pip-credentials")'),
+}
+
+# Shared keep-alive connection pool, so retries and follow-up requests skip the TCP+TLS handshake.
+# Retries are handled by _retry_post, not urllib3.
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=32, max_retries=0))
+
+try:
+    import orjson
+
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:  # orjson is optional; stdlib json is just slower on large payloads
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
+    _json_loads = json.loads
+
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
+# Teardown (deployment and secret deletion) runs here; main() drains it after the summary
+CLEANUP_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="e2e-cleanup")
+
+# Started by main() before training when the modal_secret test will run
+_SECRET_SETUP: threading.Thread | None = None
+
+
+def _client():
+    """Return a Modal deployment client shared by all tests (they may run in parallel threads)."""
+    from mlflow.deployments import get_deploy_client
+
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            _CLIENT = get_deploy_client("modal")
+    return _CLIENT
+
+
+def _cleanup_in_background(description: str, func, *args, **kwargs) -> None:
+    """Run a teardown call on CLEANUP_POOL so the test can return without waiting on it."""
+
+    def cleanup():
+        try:
+            func(*args, **kwargs)
+            print(f"  Cleaned up {description}")
+        except Exception:
+            pass
 
-import mlflow
-from mlflow.deployments import get_deploy_client
-from sklearn.datasets import load_iris
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
+    CLEANUP_POOL.submit(cleanup)
 
 
-def train_and_log_model():
-    """Train a simple model and log to MLflow."""
-    print("Training model...")
-    iris = load_iris()
-    X_train, _, y_train, _ = train_test_split(iris.data, iris.target, test_size=0.2, random_state=42)
-    model = RandomForestClassifier(n_estimators=5, random_state=42)
-    model.fit(X_train, y_train)
+def _model_cache_key() -> str:
+    """Return a key identifying the current model settings."""
+    # Read versions from package metadata so a cache hit never imports scikit-learn.
+    # mlflow is part of the key so an upgrade re-logs the model and the run covers
+    # the current log_model output (MLmodel layout, requirements.txt).
+    return hashlib.sha256(
+        repr((version("mlflow"), version("scikit-learn"), "iris-full", N_ESTIMATORS, MAX_DEPTH, RANDOM_STATE)).encode()
+    ).hexdigest()
 
-    with mlflow.start_run() as run:
-        mlflow.sklearn.log_model(model, "model")
-        print(f"  Run ID: {run.info.run_id}")
-        return run.info.run_id
 
+def _is_reusable_run(run) -> bool:
+    """Return True if run is active and its model artifact still exists."""
+    import mlflow
 
-def make_prediction(endpoint_url: str, max_attempts: int = 3) -> dict | None:
-    """Make a prediction request to the deployed model."""
-    import requests
+    return run.info.lifecycle_stage == "active" and bool(
+        mlflow.artifacts.list_artifacts(artifact_uri=f"runs:/{run.info.run_id}/model")
+    )
 
-    sample_data = {
-        "sepal length (cm)": [5.1],
-        "sepal width (cm)": [3.5],
-        "petal length (cm)": [1.4],
-        "petal width (cm)": [0.2],
-    }
 
-    for attempt in range(max_attempts):
-        try:
-            response = requests.post(endpoint_url, json=sample_data, timeout=180)
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            if attempt < max_attempts - 1:
-                print(f"    Attempt {attempt + 1} failed, retrying in 15s...")
-                time.sleep(15)
-            else:
-                print(f"    Prediction timed out (cold start): {e}")
-                return None
+def _cached_run_id(cache_file: Path) -> str | None:
+    """Return the cached run ID if it is still reusable in the current tracking store."""
+    import mlflow
 
+    if not cache_file.exists():
+        return None
+    run_id = cache_file.read_text().strip()
+    try:
+        if _is_reusable_run(mlflow.get_run(run_id)):
+            return run_id
+    except Exception:
+        pass
+    return None
 
-def test_basic_deployment(run_id: str) -> bool:
-    """Test basic deployment with extra_pip_packages."""
-    print("\n" + "=" * 60)
-    print("TEST: Basic deployment with extra_pip_packages")
-    print("=" * 60)
 
-    client = get_deploy_client("modal")
-    deployment_name = "e2e-test-basic"
+def _tagged_run_id(cache_key: str) -> str | None:
+    """Return the latest active run tagged with cache_key whose model artifact still exists."""
+    import mlflow
 
     try:
-        deployment = client.create_deployment(
-            name=deployment_name,
-            model_uri=f"runs:/{run_id}/model",
-            config={
-                "memory": 1024,
-                "timeout": 120,
-                "scaledown_window": 60,
-                "extra_pip_packages": ["structlog>=24.0"],
-            },
+        runs = mlflow.search_runs(
+            search_all_experiments=True,
+            filter_string=f"tags.{MODEL_CACHE_TAG} = '{cache_key}'",
+            order_by=["start_time DESC"],
+            max_results=1,
+            output_format="list",
         )
+        for run in runs:
+            if _is_reusable_run(run):
+                return run.info.run_id
+    except Exception:
+        pass
+    return None
+
+
+def train_and_log_model(retrain: bool = False) -> str:
+    """Train a simple model and log to MLflow, reusing a cached run when possible."""
+    cache_key = _model_cache_key()
+    cache_file = MODEL_CACHE_DIR / f"{cache_key}.txt"
+    run_id = None
+    if not retrain:
+        # Local cache file first; fall back to the tracking store (e.g. a fresh CI machine)
+        run_id = _cached_run_id(cache_file) or _tagged_run_id(cache_key)
+    if run_id:
+        print(f"Reusing cached model run: {run_id}")
+    else:
+        run_id = _train_and_log(cache_key)
 
-        print("  Deployment successful!")
-        print(f"  Endpoint URL: {deployment.get('endpoint_url')}")
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    cache_file.write_text(run_id)
+    return run_id
 
-        # Verify config
-        config = deployment.get("config", {})
-        assert config.get("extra_pip_packages") == ["structlog>=24.0"]
-        print("  extra_pip_packages correctly set")
 
-        # Make prediction
-        endpoint_url = deployment.get("endpoint_url")
-        if endpoint_url:
-            print("  Testing prediction...")
-            result = make_prediction(endpoint_url)
-            if result:
-                print(f"  Prediction successful: {result}")
-            else:
-                print("  Prediction timed out, but deployment was created")
-
-        return True
+def _train_and_log(cache_key: str) -> str:
+    """Train the smoke-test model and log it in a run tagged with cache_key."""
+    print("Training model...")
+    import mlflow
+    from sklearn.datasets import load_iris
+    from sklearn.ensemble import RandomForestClassifier
 
-    except Exception as e:
-        print(f"  FAILED: {e}")
-        import traceback
+    iris = load_iris()
+    # Smoke test only: no held-out set is needed, so train on the full dataset.
+    # The model only exercises the deployment path, so keep the artifact tiny.
+    model = RandomForestClassifier(n_estimators=N_ESTIMATORS, max_depth=MAX_DEPTH, random_state=RANDOM_STATE)
+    model.fit(iris.data, iris.target)
 
-        traceback.print_exc()
-        return False
+    with mlflow.start_run(tags={MODEL_CACHE_TAG: cache_key}) as run:
+        mlflow.sklearn.log_model(model, "model")
+        print(f"  Run ID: {run.info.run_id}")
+    return run.info.run_id
+
+
+def _backoff_delay(attempt: int, base: float = 2.0, multiplier: float = 2.0, cap: float = 20.0) -> float:
+    """Exponential backoff: 2s, 4s, 8s, ... capped at 20s."""
+    return min(cap, base * multiplier**attempt)
+
+
+def _hedged_post(url: str, payload: dict, hedge_delay: float | None = None) -> dict | None:
+    """
+    POST JSON and return the parsed response; if none arrives within hedge_delay, send a duplicate.
+
+    Cold-start latency varies a lot between containers, so whichever request is
+    answered first wins. The slower request is abandoned rather than awaited.
+    The first request reuses the shared session; the hedge opens a fresh session
+    so it does a new DNS lookup and connection instead of queueing behind the
+    slow one.
+
+    Returns None when the endpoint answers with a 5xx (typically a 503 while the
+    container is still starting); other HTTP errors and network failures raise.
+    """
+    if hedge_delay is None:
+        hedge_delay = HEDGE_DELAY
+    hedge_session = requests.Session()
+    # Encode once; both requests send the same bytes
+    body = _json_dumps(payload)
+
+    def post(session):
+        with session.post(
+            url, data=body, headers={"Content-Type": "application/json"}, timeout=PREDICT_TIMEOUT, stream=True
+        ) as response:
+            # Expected during cold start: report it as a value rather than raising
+            if response.status_code >= 500:
+                return None
+            response.raise_for_status()
+            # Parse straight from the raw bytes rather than decoding to str first
+            response.raw.decode_content = True
+            return _json_loads(response.raw.read())
 
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        futures = {executor.submit(post, _SESSION)}
+        done, _ = wait(futures, timeout=hedge_delay)
+        if not done:
+            futures.add(executor.submit(post, hedge_session))
+
+        error = None
+        while futures:
+            done, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                elif future.result() is not None:
+                    return future.result()
+        if error is not None:
+            raise error
+        return None
     finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        hedge_session.close()
+
+
+def _prewarm(endpoint_url: str | None) -> None:
+    """Fire a background GET at the endpoint so its container starts booting before the first POST."""
+    if not endpoint_url:
+        return
+
+    def ping():
         try:
-            client.delete_deployment(deployment_name)
-            print(f"  Cleaned up: {deployment_name}")
-        except Exception:
+            # Any request routes to the container, so a 405 still triggers the cold start
+            _SESSION.get(endpoint_url, timeout=5)
+        except requests.RequestException:
             pass
 
+    threading.Thread(target=ping, daemon=True).start()
 
-def test_pip_index_url(run_id: str) -> bool:
-    """Test deployment with pip_index_url."""
-    print("\n" + "=" * 60)
-    print("TEST: pip_index_url configuration")
-    print("=" * 60)
 
-    client = get_deploy_client("modal")
-    deployment_name = "e2e-test-pip-index-url"
+def _endpoint_unavailable(url: str) -> bool:
+    """
+    Cheap HEAD probe: True only if the endpoint quickly answers 502/503/504.
 
+    Any other status (2xx, 405, or 501 from servers without HEAD support) means
+    the app is routing requests, and a probe timeout only means the container is
+    still booting, so in those cases the POST is worth sending.
+    """
     try:
-        deployment = client.create_deployment(
-            name=deployment_name,
-            model_uri=f"runs:/{run_id}/model",
-            config={
-                "memory": 1024,
-                "timeout": 120,
-                "scaledown_window": 60,
-                "pip_index_url": "https://pypi.org/simple/",
-            },
-        )
+        return _SESSION.head(url, timeout=5).status_code in (502, 503, 504)
+    except requests.RequestException:
+        return False
 
-        print("  Deployment successful!")
-        print(f"  Endpoint URL: {deployment.get('endpoint_url')}")
 
-        config = deployment.get("config", {})
-        assert config.get("pip_index_url") == "https://pypi.org/simple/"
-        print("  pip_index_url correctly set")
+def _retry_post(url: str, payload: dict, attempts: int = 4) -> dict | None:
+    """POST JSON with exponential backoff between attempts; return the parsed response or None."""
+    for attempt in range(attempts):
+        if _endpoint_unavailable(url):
+            result, reason = None, "endpoint unavailable (HEAD probe)"
+        else:
+            try:
+                result = _hedged_post(url, payload)
+            except Exception as e:
+                result, reason = None, e
+            else:
+                reason = "server error (endpoint still starting)"
+        if result is not None:
+            return result
+
+        if attempt < attempts - 1:
+            delay = _backoff_delay(attempt)
+            print(f"    Attempt {attempt + 1} failed, retrying in {delay:.0f}s...")
+            time.sleep(delay)
+        else:
+            print(f"    Prediction timed out (cold start): {reason}")
+    return None
 
-        endpoint_url = deployment.get("endpoint_url")
-        if endpoint_url:
-            print("  Testing prediction...")
-            result = make_prediction(endpoint_url)
-            if result:
-                print(f"  Prediction successful: {result}")
 
-        return True
+def make_prediction(endpoint_url: str, max_attempts: int = 4) -> dict | None:
+    """Make a prediction request to the deployed model."""
+    return _retry_post(endpoint_url, SAMPLE_DATA, attempts=max_attempts)
 
-    except Exception as e:
-        print(f"  FAILED: {e}")
-        import traceback
 
-        traceback.print_exc()
-        return False
+def test_config_only() -> bool:
+    """Check config parsing and code generation for each option, without deploying."""
+    from mlflow_modal.deployment import _generate_modal_app_code
 
-    finally:
-        try:
-            client.delete_deployment(deployment_name)
-            print(f"  Cleaned up: {deployment_name}")
-        except Exception:
-            pass
+    print("\n" + "=" * 60)
+    print("TEST: Config passthrough (in-process, no deployment)")
+    print("=" * 60)
 
+    client = _client()
+    passed = True
+    for key, (value, snippet) in CONFIG_CASES.items():
+        config = client._apply_custom_config(client._default_deployment_config(), {key: value})
+        code = _generate_modal_app_code("e2e-test-config", config, None)
+        if config.get(key) == value and snippet in code:
+            print(f"  {key} correctly set")
+        else:
+            print(f"  FAILED: {key} not reflected in config or generated code")
+            passed = False
+    return passed
 
-def test_pip_extra_index_url(run_id: str) -> bool:
-    """Test deployment with pip_extra_index_url."""
+
+def _test_config_passthrough(run_id: str, title: str, deployment_name: str, key: str, predict: bool = True) -> bool:
+    """Deploy with one CONFIG_CASES option set, check it is echoed back, and optionally predict."""
     print("\n" + "=" * 60)
-    print("TEST: pip_extra_index_url configuration")
+    print(f"TEST: {title}")
     print("=" * 60)
 
-    client = get_deploy_client("modal")
-    deployment_name = "e2e-test-pip-extra-index"
+    value, _ = CONFIG_CASES[key]
+    client = _client()
 
     try:
         deployment = client.create_deployment(
@@ -195,113 +373,103 @@ def test_pip_extra_index_url(run_id: str) -> bool:
                 "memory": 1024,
                 "timeout": 120,
                 "scaledown_window": 60,
-                "pip_extra_index_url": "https://pypi.org/simple/",
+                # Keep one container up from deploy time so the first prediction is warm
+                "min_containers": 1 if predict else 0,
+                key: value,
             },
         )
+        if predict:
+            _prewarm(deployment.get("endpoint_url"))
 
         print("  Deployment successful!")
         print(f"  Endpoint URL: {deployment.get('endpoint_url')}")
 
+        # Verify config
         config = deployment.get("config", {})
-        assert config.get("pip_extra_index_url") == "https://pypi.org/simple/"
-        print("  pip_extra_index_url correctly set")
+        # Explicit check rather than assert, so it still runs under python -O
+        if config.get(key) != value:
+            raise AssertionError(f"{key} mismatch: expected {value!r}, got {config.get(key)!r}")
+        print(f"  {key} correctly set")
+
+        # Make prediction
+        endpoint_url = deployment.get("endpoint_url")
+        if predict and endpoint_url:
+            print("  Testing prediction...")
+            result = make_prediction(endpoint_url)
+            if result:
+                print(f"  Prediction successful: {result}")
+            else:
+                print("  Prediction timed out, but deployment was created")
 
         return True
 
     except Exception as e:
         print(f"  FAILED: {e}")
-        import traceback
-
         traceback.print_exc()
         return False
 
     finally:
-        try:
-            client.delete_deployment(deployment_name)
-            print(f"  Cleaned up: {deployment_name}")
-        except Exception:
-            pass
+        _cleanup_in_background(deployment_name, client.delete_deployment, deployment_name)
 
 
-def test_modal_secret(run_id: str) -> bool:
-    """Test deployment with modal_secret integration."""
-    print("\n" + "=" * 60)
-    print("TEST: modal_secret integration")
-    print("=" * 60)
+def test_basic_deployment(run_id: str) -> bool:
+    """Test basic deployment with extra_pip_packages."""
+    return _test_config_passthrough(
+        run_id, "Basic deployment with extra_pip_packages", "e2e-test-basic", "extra_pip_packages"
+    )
 
-    # Create test Modal secret
-    secret_name = "e2e-test-pip-credentials"
-    print(f"  Creating Modal secret '{secret_name}'...")
 
-    result = subprocess.run(
-        [
-            "modal",
-            "secret",
-            "create",
-            secret_name,
-            "PIP_EXTRA_INDEX_URL=https://pypi.org/simple/",
-            "--force",
-        ],
-        capture_output=True,
-        text=True,
+def test_pip_index_url(run_id: str) -> bool:
+    """Test deployment with pip_index_url."""
+    return _test_config_passthrough(run_id, "pip_index_url configuration", "e2e-test-pip-index-url", "pip_index_url")
+
+
+def test_pip_extra_index_url(run_id: str) -> bool:
+    """Test deployment with pip_extra_index_url."""
+    return _test_config_passthrough(
+        run_id,
+        "pip_extra_index_url configuration",
+        "e2e-test-pip-extra-index",
+        "pip_extra_index_url",
+        predict=False,
     )
 
-    if result.returncode != 0:
-        print(f"  Warning: Could not create secret: {result.stderr}")
-    else:
-        print("  Secret created")
 
-    client = get_deploy_client("modal")
-    deployment_name = "e2e-test-modal-secret"
+def _create_test_secret() -> None:
+    """Create (or reuse) the Modal secret used by test_modal_secret."""
+    secret_name, _ = CONFIG_CASES["modal_secret"]
+    print(f"  Creating Modal secret '{secret_name}'...")
 
     try:
-        deployment = client.create_deployment(
-            name=deployment_name,
-            model_uri=f"runs:/{run_id}/model",
-            config={
-                "memory": 1024,
-                "timeout": 120,
-                "scaledown_window": 60,
-                "modal_secret": secret_name,
-            },
+        modal.Secret.objects.create(
+            secret_name,
+            {"PIP_EXTRA_INDEX_URL": "https://pypi.org/simple/"},
+            allow_existing=True,
         )
+        print("  Secret created")
+    except Exception as e:
+        print(f"  Warning: Could not create secret: {e}")
 
-        print("  Deployment successful!")
-        print(f"  Endpoint URL: {deployment.get('endpoint_url')}")
 
-        config = deployment.get("config", {})
-        assert config.get("modal_secret") == secret_name
-        print("  modal_secret correctly set")
+def _start_secret_setup() -> None:
+    """Create the test secret in a background thread, overlapping the mlflow import and model training."""
+    global _SECRET_SETUP
+    _SECRET_SETUP = threading.Thread(target=_create_test_secret)
+    _SECRET_SETUP.start()
 
-        endpoint_url = deployment.get("endpoint_url")
-        if endpoint_url:
-            print("  Testing prediction...")
-            result = make_prediction(endpoint_url)
-            if result:
-                print(f"  Prediction successful: {result}")
 
-        return True
-
-    except Exception as e:
-        print(f"  FAILED: {e}")
-        import traceback
-
-        traceback.print_exc()
-        return False
+def test_modal_secret(run_id: str) -> bool:
+    """Test deployment with modal_secret integration."""
+    secret_name, _ = CONFIG_CASES["modal_secret"]
+    if _SECRET_SETUP is None:
+        _create_test_secret()
+    else:
+        _SECRET_SETUP.join()
 
+    try:
+        return _test_config_passthrough(run_id, "modal_secret integration", "e2e-test-modal-secret", "modal_secret")
     finally:
-        try:
-            client.delete_deployment(deployment_name)
-            print(f"  Cleaned up: {deployment_name}")
-        except Exception:
-            pass
-
-        # Clean up secret
-        subprocess.run(
-            ["modal", "secret", "delete", secret_name, "--yes"],
-            capture_output=True,
-        )
-        print(f"  Cleaned up secret: {secret_name}")
+        _cleanup_in_background(f"secret {secret_name}", modal.Secret.objects.delete, secret_name, allow_missing=True)
 
 
 def test_streaming(run_id: str) -> bool:
@@ -310,7 +478,7 @@ def test_streaming(run_id: str) -> bool:
     print("TEST: Streaming predictions (predict_stream)")
     print("=" * 60)
 
-    client = get_deploy_client("modal")
+    client = _client()
     deployment_name = "e2e-test-streaming"
 
     try:
@@ -321,8 +489,10 @@ def test_streaming(run_id: str) -> bool:
                 "memory": 1024,
                 "timeout": 120,
                 "scaledown_window": 60,
+                "min_containers": 1,
             },
         )
+        _prewarm(deployment.get("endpoint_url"))
 
         print("  Deployment successful!")
         endpoint_url = deployment.get("endpoint_url")
@@ -334,17 +504,6 @@ def test_streaming(run_id: str) -> bool:
 
         # Test regular predict first
         print("  Testing regular predict()...")
-        sample_data = {
-            "sepal length (cm)": [5.1],
-            "sepal width (cm)": [3.5],
-            "petal length (cm)": [1.4],
-            "petal width (cm)": [0.2],
-        }
-
-        # Wait for cold start
-        print("  Waiting for container to warm up...")
-        time.sleep(10)
-
         result = make_prediction(endpoint_url)
         if result:
             print(f"  Regular predict() successful: {result}")
@@ -357,7 +516,7 @@ def test_streaming(run_id: str) -> bool:
         try:
             for chunk in client.predict_stream(
                 deployment_name=deployment_name,
-                inputs=sample_data,
+                inputs=SAMPLE_DATA,
             ):
                 chunks.append(chunk)
                 print(f"    Received chunk: {chunk}")
@@ -365,8 +524,6 @@ def test_streaming(run_id: str) -> bool:
             print(f"  predict_stream() error: {e}")
             # This might fail if the model doesn't support streaming natively
             # but the endpoint should still return a single chunk with predictions
-            import traceback
-
             traceback.print_exc()
 
         if chunks:
@@ -380,23 +537,19 @@ def test_streaming(run_id: str) -> bool:
             print("  No chunks received from streaming endpoint")
             # Try direct HTTP request to streaming endpoint for debugging
             print("  Attempting direct HTTP request to streaming endpoint...")
-            import requests
+            from mlflow_modal.deployment import _get_stream_url
 
-            # Handle both URL patterns: path-based (/predict) and subdomain-based (-predict.)
-            if "/predict" in endpoint_url:
-                stream_url = endpoint_url.replace("/predict", "/predict_stream")
-            else:
-                stream_url = endpoint_url.replace("-predict.", "-predict-stream.")
+            stream_url = _get_stream_url(endpoint_url)
             try:
-                with requests.post(
+                with _SESSION.post(
                     stream_url,
-                    json=sample_data,
+                    json=SAMPLE_DATA,
                     stream=True,
                     headers={"Accept": "text/event-stream"},
-                    timeout=180,
+                    timeout=PREDICT_TIMEOUT,
                 ) as response:
                     response.raise_for_status()
-                    for line in response.iter_lines():
+                    for line in response.iter_lines(chunk_size=8192, decode_unicode=True):
                         if line:
                             print(f"    Raw line: {line}")
                             chunks.append(line)
@@ -410,49 +563,91 @@ def test_streaming(run_id: str) -> bool:
 
     except Exception as e:
         print(f"  FAILED: {e}")
-        import traceback
-
         traceback.print_exc()
         return False
 
     finally:
-        try:
-            client.delete_deployment(deployment_name)
-            print(f"  Cleaned up: {deployment_name}")
-        except Exception:
-            pass
+        _cleanup_in_background(deployment_name, client.delete_deployment, deployment_name)
 
 
 def main():
+    global HEDGE_DELAY
+
     parser = argparse.ArgumentParser(description="E2E tests for mlflow-modal-deploy")
     parser.add_argument("--quick", action="store_true", help="Run quick test only")
     parser.add_argument("--stream", action="store_true", help="Run streaming test only")
+    parser.add_argument("--config-only", action="store_true", help="Run in-process config checks only")
+    parser.add_argument("--retrain", action="store_true", help="Retrain instead of reusing the cached model run")
+    parser.add_argument(
+        "--hedge-delay",
+        type=float,
+        default=HEDGE_DELAY,
+        help=f"Seconds before a slow prediction is hedged with a duplicate request (default: {HEDGE_DELAY:g})",
+    )
+    parser.add_argument(
+        "--parallel",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Run independent deployment tests concurrently (output may interleave)",
+    )
     args = parser.parse_args()
+    HEDGE_DELAY = args.hedge_delay
 
     print("=" * 60)
     print("E2E Tests: mlflow-modal-deploy")
     print("=" * 60)
 
-    run_id = train_and_log_model()
-
-    results = {}
-
-    if args.quick:
-        results["basic_deployment"] = test_basic_deployment(run_id)
+    if args.config_only:
+        tests = {}
+    elif args.quick:
+        tests = {"basic_deployment": test_basic_deployment}
     elif args.stream:
-        results["streaming"] = test_streaming(run_id)
+        tests = {"streaming": test_streaming}
     else:
-        results["basic_deployment"] = test_basic_deployment(run_id)
-        results["streaming"] = test_streaming(run_id)
-        results["pip_index_url"] = test_pip_index_url(run_id)
-        results["pip_extra_index_url"] = test_pip_extra_index_url(run_id)
-        results["modal_secret"] = test_modal_secret(run_id)
+        tests = {
+            "basic_deployment": test_basic_deployment,
+            "streaming": test_streaming,
+            "pip_index_url": test_pip_index_url,
+            "pip_extra_index_url": test_pip_extra_index_url,
+            "modal_secret": test_modal_secret,
+        }
+
+    if "modal_secret" in tests:
+        # Started before the config checks, so the secret round trip to Modal overlaps
+        # the mlflow import they trigger as well as sklearn fit and MLflow logging
+        _start_secret_setup()
+
+    # Cheap in-process checks first: a config regression fails in seconds, not after a build
+    config_passed = test_config_only()
+    if not config_passed:
+        if _SECRET_SETUP is not None:
+            _SECRET_SETUP.join()
+            secret_name, _ = CONFIG_CASES["modal_secret"]
+            _cleanup_in_background(
+                f"secret {secret_name}", modal.Secret.objects.delete, secret_name, allow_missing=True
+            )
+            CLEANUP_POOL.shutdown(wait=True)
+        return 1
+    if args.config_only:
+        return 0
+
+    run_id = train_and_log_model(retrain=args.retrain)
+
+    if args.parallel and len(tests) > 1:
+        # Each test uses its own deployment name and mostly waits on Modal builds
+        # and HTTP, so threads overlap the cold starts despite the GIL
+        with ThreadPoolExecutor(max_workers=len(tests)) as executor:
+            futures = {name: executor.submit(test, run_id) for name, test in tests.items()}
+            results = {name: future.result() for name, future in futures.items()}
+    else:
+        results = {name: test(run_id) for name, test in tests.items()}
 
     # Summary
     print("\n" + "=" * 60)
     print("TEST SUMMARY")
     print("=" * 60)
 
+    results = {"config_only": config_passed, **results}
     all_passed = True
     for test_name, passed in results.items():
         status = "PASSED" if passed else "FAILED"
@@ -463,6 +658,9 @@ def main():
 
     print("=" * 60)
 
+    # Teardown overlapped with the summary; wait for it before exiting
+    CLEANUP_POOL.shutdown(wait=True)
+
     return 0 if all_passed else 1
 
 
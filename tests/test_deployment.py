@@ -1,5 +1,7 @@
 """Tests for MLflow Modal deployment client."""
 
+import ast
+
 import pytest
 
 import mlflow_modal
@@ -11,8 +13,11 @@ from mlflow_modal.deployment import (
     _get_model_python_version,
     _get_model_requirements,
     _get_preferred_deployment_flavor,
+    _get_stream_url,
+    _render_modal_app_code_cached,
     _sanitize_deployment_name,
     _validate_deployment_flavor,
+    _warn_on_base_image_python_mismatch,
     target_help,
 )
 
@@ -67,6 +72,8 @@ class TestDefaultConfig:
         assert config["enable_batching"] is False
         assert config["max_batch_size"] == 8
         assert config["min_containers"] == 0
+        assert config["base_image"] is None
+        assert config["single_thread_estimators"] is True
 
 
 class TestConfigValidation:
@@ -220,6 +227,22 @@ class TestPythonVersionDetection:
         result = _get_model_python_version(str(tmp_path))
         assert result == expected
 
+    @pytest.mark.parametrize(
+        "base_image,python_version,warns",
+        [
+            ("python:3.11-slim-bookworm", "3.10", True),
+            ("python:3.10-slim-bookworm", "3.10", False),
+            ("nvcr.io/nvidia/pytorch:24.01-py3.12", "3.10", True),
+            ("my-registry/serving:latest", "3.10", False),
+            (None, "3.10", False),
+        ],
+    )
+    def test_base_image_python_mismatch_warning(self, caplog, base_image, python_version, warns):
+        with caplog.at_level("WARNING", logger="mlflow_modal.deployment"):
+            _warn_on_base_image_python_mismatch(base_image, python_version)
+
+        assert ("python_version is ignored" in caplog.text) is warns
+
 
 class TestAppCodeGeneration:
     def test_basic_app_generation(self):
@@ -288,6 +311,97 @@ class TestAppCodeGeneration:
         assert "wait_ms=200" in code
         assert "def predict_batch" in code
 
+    def test_batch_predicts_once_per_batch(self):
+        config = {
+            "gpu": None,
+            "memory": 512,
+            "cpu": 1.0,
+            "timeout": 300,
+            "scaledown_window": 60,
+            "enable_batching": True,
+            "python_version": "3.10",
+            "concurrent_inputs": 1,
+        }
+
+        code = _generate_modal_app_code("batch-app", config)
+
+        predict_batch = code.split("def predict_batch")[1].split("@modal.fastapi_endpoint")[0]
+        assert predict_batch.count("self.model.predict(") == 1
+        assert "pd.concat(frames, ignore_index=True)" in predict_batch
+
+    def test_batching_endpoint_submits_to_batch_queue(self):
+        config = {
+            "gpu": None,
+            "memory": 512,
+            "cpu": 1.0,
+            "timeout": 300,
+            "scaledown_window": 60,
+            "enable_batching": True,
+            "python_version": "3.10",
+            "concurrent_inputs": 32,
+        }
+
+        code = _generate_modal_app_code("batch-app", config)
+
+        # Modal only merges inputs that arrive as separate calls; a .local() call
+        # from the endpoint would run every request as a batch of one
+        assert "class MLflowBatchModel:" in code
+        assert "MLflowBatchModel().predict_batch.remote(input_data)" in code
+        assert ".local(" not in code
+
+    def test_batching_front_class_holds_no_model(self):
+        config = {
+            "gpu": "A100",
+            "memory": 4096,
+            "cpu": 1.0,
+            "timeout": 300,
+            "scaledown_window": 60,
+            "enable_batching": True,
+            "python_version": "3.10",
+            "min_containers": 1,
+            "concurrent_inputs": 32,
+        }
+
+        code = _generate_modal_app_code("batch-app", config)
+
+        # GPU, warm containers and the loaded model belong to the batch class only;
+        # the HTTP front just forwards requests to it
+        batch_cls, front_cls = code.split("class MLflowBatchModel:")[1].split("class MLflowModel:")
+        front_decorator = batch_cls.rsplit("@app.cls(", 1)[1]
+        assert code.count('gpu="A100"') == 1
+        assert code.count("min_containers=1") == 1
+        assert code.count("@modal.enter()") == 1
+        assert "@modal.enter()" in batch_cls
+        assert "gpu=" not in front_decorator
+        assert "min_containers" not in front_decorator
+        assert "volumes=" not in front_decorator
+        assert "self.model" not in front_cls
+        assert front_cls.count("MLflowBatchModel().predict_batch.remote(input_data)") == 2
+
+    @pytest.mark.parametrize("enable_batching", [False, True])
+    def test_generated_app_defines_under_modal(self, enable_batching):
+        modal = pytest.importorskip("modal")
+        config = {
+            "gpu": None,
+            "memory": 512,
+            "cpu": 1.0,
+            "timeout": 300,
+            "scaledown_window": 60,
+            "enable_batching": enable_batching,
+            "python_version": "3.10",
+            "concurrent_inputs": 4,
+        }
+
+        code = _generate_modal_app_code("define-app", config)
+
+        # Modal validates decorators at class-definition time (e.g. a class with a
+        # @modal.batched method may not define any other method)
+        namespace = {}
+        exec(compile(code, "<generated>", "exec"), namespace)
+        assert isinstance(namespace["app"], modal.App)
+        assert "MLflowModel" in namespace
+        assert ("MLflowBatchModel" in namespace) is enable_batching
+
     def test_model_requirements_included(self):
         config = {
             "gpu": None,
@@ -723,6 +837,120 @@ class TestAppCodeGenerationEdgeCases:
         assert '"pandas>=2.0"' in code
         assert '"transformers>=4.30"' in code
 
+    def test_pip_packages_sorted_and_deduplicated(self):
+        config = {
+            "gpu": None,
+            "memory": 512,
+            "cpu": 1.0,
+            "timeout": 300,
+            "scaledown_window": 60,
+            "enable_batching": False,
+            "python_version": "3.10",
+            "concurrent_inputs": 1,
+            "extra_pip_packages": ["structlog>=24.0", "numpy==1.24.0"],
+        }
+
+        code = _generate_modal_app_code("dedup-app", config, ["pandas>=2.0", "numpy==1.24.0"])
+
+        assert '.uv_pip_install("mlflow", "numpy==1.24.0", "pandas>=2.0", "structlog>=24.0")' in code
+
+    def test_pip_package_order_does_not_change_generated_code(self):
+        def generate(extra_pip_packages, model_requirements):
+            config = {
+                "gpu": None,
+                "memory": 512,
+                "cpu": 1.0,
+                "timeout": 300,
+                "scaledown_window": 60,
+                "enable_batching": False,
+                "python_version": "3.10",
+                "concurrent_inputs": 1,
+                "extra_pip_packages": extra_pip_packages,
+            }
+            return _generate_modal_app_code("order-app", config, model_requirements)
+
+        first = generate(["structlog>=24.0", "accelerate>=0.24", "numpy"], ["scikit-learn==1.5.0", "numpy"])
+        second = generate(["numpy", "accelerate>=0.24", "structlog>=24.0"], ["numpy", "scikit-learn==1.5.0"])
+
+        assert first == second
+
+    def test_debian_slim_base_image_by_default(self):
+        config = {
+            "gpu": None,
+            "memory": 512,
+            "cpu": 1.0,
+            "timeout": 300,
+            "scaledown_window": 60,
+            "enable_batching": False,
+            "python_version": "3.11",
+            "concurrent_inputs": 1,
+        }
+
+        code = _generate_modal_app_code("slim-app", config)
+
+        assert 'modal.Image.debian_slim(python_version="3.11")' in code
+        assert "from_registry" not in code
+
+    def test_base_image_uses_registry_tag(self):
+        config = {
+            "gpu": None,
+            "memory": 512,
+            "cpu": 1.0,
+            "timeout": 300,
+            "scaledown_window": 60,
+            "enable_batching": False,
+            "python_version": "3.10",
+            "concurrent_inputs": 1,
+            "base_image": "python:3.10-slim-bookworm",
+        }
+
+        code = _generate_modal_app_code("registry-app", config)
+
+        assert 'modal.Image.from_registry("python:3.10-slim-bookworm")' in code
+        assert "debian_slim" not in code
+
+
+class TestAppCodeGenerationCache:
+    def _config(self):
+        return {
+            "gpu": ["H100", "A100"],
+            "memory": 512,
+            "cpu": 1.0,
+            "timeout": 300,
+            "scaledown_window": 60,
+            "enable_batching": False,
+            "python_version": "3.10",
+            "concurrent_inputs": 1,
+            "extra_pip_packages": ["structlog>=24.0"],
+        }
+
+    def test_identical_config_hits_cache(self):
+        _render_modal_app_code_cached.cache_clear()
+
+        first = _generate_modal_app_code("cache-app", self._config(), ["numpy"])
+        second = _generate_modal_app_code("cache-app", self._config(), ["numpy"])
+
+        assert first == second
+        assert _render_modal_app_code_cached.cache_info().hits == 1
+
+    def test_changed_config_is_not_served_from_cache(self):
+        config = self._config()
+        code = _generate_modal_app_code("cache-app", config)
+
+        config["memory"] = 2048
+        updated = _generate_modal_app_code("cache-app", config)
+
+        assert "memory=512" in code
+        assert "memory=2048" in updated
+
+    def test_non_json_config_still_generates(self):
+        config = self._config()
+        config["custom_object"] = object()
+
+        code = _generate_modal_app_code("cache-app", config)
+
+        assert 'gpu=["H100", "A100"]' in code
+
 
 class TestExtraPipPackagesConfig:
     def test_extra_pip_packages_in_default_config(self):
@@ -964,6 +1192,177 @@ class TestStreamingEndpointGeneration:
         assert "hasattr(self.model, 'predict_stream')" in code
 
 
+def _load_generated_helper(name):
+    """Execute a single top-level helper from generated app code, without the Modal app."""
+    config = {
+        "gpu": None,
+        "memory": 512,
+        "cpu": 1.0,
+        "timeout": 300,
+        "scaledown_window": 60,
+        "enable_batching": False,
+        "python_version": "3.10",
+        "concurrent_inputs": 1,
+    }
+    module = ast.parse(_generate_modal_app_code("helper-app", config))
+    helper = [node for node in module.body if isinstance(node, ast.FunctionDef) and node.name == name]
+    namespace = {}
+    exec(compile(ast.Module(body=helper, type_ignores=[]), "<generated>", "exec"), namespace)
+    return namespace[name]
+
+
+class TestDataframeInputParsing:
+    """Tests for request body parsing in generated Modal app code."""
+
+    def test_dataframe_split_input(self):
+        to_dataframe = _load_generated_helper("_to_dataframe")
+
+        df = to_dataframe({"dataframe_split": {"columns": ["a", "b"], "data": [[1, 2], [3, 4]]}})
+
+        assert list(df.columns) == ["a", "b"]
+        assert df.values.tolist() == [[1, 2], [3, 4]]
+
+    def test_column_dict_input(self):
+        to_dataframe = _load_generated_helper("_to_dataframe")
+
+        df = to_dataframe({"a": [1, 3], "b": [2, 4]})
+
+        assert list(df.columns) == ["a", "b"]
+        assert df.values.tolist() == [[1, 2], [3, 4]]
+
+    @pytest.mark.parametrize("enable_batching", [False, True])
+    def test_endpoints_use_dataframe_helper(self, enable_batching):
+        config = {
+            "gpu": None,
+            "memory": 512,
+            "cpu": 1.0,
+            "timeout": 300,
+            "scaledown_window": 60,
+            "enable_batching": enable_batching,
+            "python_version": "3.10",
+            "concurrent_inputs": 1,
+        }
+
+        code = _generate_modal_app_code("split-app", config)
+
+        # Only the helper itself builds the DataFrame directly
+        assert code.count("pd.DataFrame(input_data)") == 1
+        assert "_to_dataframe(input_data)" in code
+
+
+class TestModelLoading:
+    def test_estimator_n_jobs_pinned_after_load(self):
+        config = {
+            "gpu": None,
+            "memory": 512,
+            "cpu": 1.0,
+            "timeout": 300,
+            "scaledown_window": 60,
+            "enable_batching": False,
+            "python_version": "3.10",
+            "concurrent_inputs": 1,
+        }
+
+        code = _generate_modal_app_code("n-jobs-app", config)
+
+        load_model = code.split("def load_model")[1].split("@modal.fastapi_endpoint")[0]
+        assert 'if "sklearn" in self.model.metadata.flavors:' in load_model
+        assert 'type(raw_model).__module__.startswith("sklearn.")' in load_model
+        assert "raw_model.set_params(n_jobs=1)" in load_model
+        # Failures are logged rather than swallowed
+        assert "except Exception as e:" in load_model
+        assert ".warning(" in load_model
+
+    def test_single_thread_estimators_opt_out(self):
+        client = ModalDeploymentClient("modal")
+        config = client._apply_custom_config(
+            client._default_deployment_config(), {"single_thread_estimators": "false", "python_version": "3.10"}
+        )
+
+        code = _generate_modal_app_code("n-jobs-off-app", config)
+
+        assert config["single_thread_estimators"] is False
+        assert "n_jobs" not in code
+
+
+class TestPredictionSerialization:
+    """Tests for prediction output serialization in generated Modal app code."""
+
+    def test_array_predictions(self):
+        import numpy as np
+
+        predictions_to_json = _load_generated_helper("_predictions_to_json")
+
+        assert predictions_to_json(np.array([0, 1, 2])) == [0, 1, 2]
+
+    def test_onnx_pyfunc_predictions_become_records(self, tmp_path):
+        """Round-trip a real skl2onnx classifier through mlflow.pyfunc, as the example's --onnx path does."""
+        pytest.importorskip("skl2onnx")
+        pytest.importorskip("onnxruntime")
+        import json
+
+        import mlflow.onnx
+        import mlflow.pyfunc
+        from skl2onnx import convert_sklearn
+        from skl2onnx.common.data_types import FloatTensorType
+        from sklearn.datasets import load_iris
+        from sklearn.ensemble import RandomForestClassifier
+
+        iris = load_iris()
+        model = RandomForestClassifier(n_estimators=2, max_depth=2, random_state=0).fit(iris.data, iris.target)
+        onnx_model = convert_sklearn(model, initial_types=[("float_input", FloatTensorType([None, 4]))])
+        model_path = str(tmp_path / "model")
+        mlflow.onnx.save_model(onnx_model, model_path, pip_requirements=["onnxruntime"])
+        pyfunc_model = mlflow.pyfunc.load_model(model_path)
+
+        to_dataframe = _load_generated_helper("_to_dataframe")
+        predictions_to_json = _load_generated_helper("_predictions_to_json")
+        df = to_dataframe({"dataframe_split": {"columns": list("abcd"), "data": iris.data[:2].tolist()}})
+
+        records = predictions_to_json(pyfunc_model.predict(df))
+
+        assert len(records) == 2
+        assert set(records[0]) == {"output_label", "output_probability"}
+        assert records[0]["output_label"] == model.predict(iris.data[:1])[0]
+        json.dumps(records)  # The endpoint must be able to serialize the response
+
+    def test_list_predictions_pass_through(self):
+        predictions_to_json = _load_generated_helper("_predictions_to_json")
+
+        assert predictions_to_json(["a", "b"]) == ["a", "b"]
+
+
+class TestGetStreamUrl:
+    @pytest.mark.parametrize(
+        "endpoint_url,expected",
+        [
+            ("https://test--app.modal.run/predict", "https://test--app.modal.run/predict_stream"),
+            ("https://test--app.modal.run/predict/", "https://test--app.modal.run/predict_stream"),
+            (
+                "https://ws--app-mlflowmodel-predict.modal.run",
+                "https://ws--app-mlflowmodel-predict-stream.modal.run",
+            ),
+            (
+                "https://ws--app-mlflowmodel-predict.modal.run/?a=1",
+                "https://ws--app-mlflowmodel-predict-stream.modal.run/?a=1",
+            ),
+        ],
+    )
+    def test_rewrites_method_component(self, endpoint_url, expected):
+        assert _get_stream_url(endpoint_url) == expected
+
+    def test_only_rewrites_final_path_segment(self):
+        url = "https://host.example.com/predictions/predict"
+        assert _get_stream_url(url) == "https://host.example.com/predictions/predict_stream"
+
+    def test_predict_in_later_host_label_is_untouched(self):
+        url = "https://ws--app-mlflowmodel-predict.predict-proxy.example.com/predict"
+        assert _get_stream_url(url) == "https://ws--app-mlflowmodel-predict.predict-proxy.example.com/predict_stream"
+
+    def test_unrecognized_url_returned_unchanged(self):
+        assert _get_stream_url("https://host.example.com/score") == "https://host.example.com/score"
+
+
 class TestPredictStreamMethod:
     """Tests for predict_stream() method on ModalDeploymentClient."""
 